@@ -58,6 +58,8 @@ currentDir = os.getcwd()
 errorsFile = os.path.join(currentDir, ERROR_LOG)
 newLine = os.linesep
 reJSscript = "<script[^>]*?contentType\s*?=\s*?['\"]application/x-javascript['\"][^>]*?>(.*?)</script>"
+reUnicodeEscape = re.compile("u[0-9a-f]{4}", re.IGNORECASE)
+reHexEscape = re.compile("[0-9a-f]{2}", re.IGNORECASE)
 preDefinedCode = "var app = this;"
 
 
@@ -308,33 +310,27 @@ def unescape(escapedBytes: str, unicode: bool = True):
                 splitBytes = escapedBytes.split("\\")
             else:
                 splitBytes = escapedBytes.split("%")
-            for k, v in enumerate(splitBytes):
-                splitByte = v
+            # Pieces are accumulated in a list and joined once at the end, the
+            # non-escaped tail of each token is padded with a single join call
+            pieces = []
+            for k, splitByte in enumerate(splitBytes):
                 if splitByte == "":
                     continue
-                if len(splitByte) > 4 and re.match(
-                    "u[0-9a-f]{4}", splitByte[:5], re.IGNORECASE
-                ):
-                    unescapedBytes += chr(int(splitByte[3] + splitByte[4], 16)) + chr(
-                        int(splitByte[1] + splitByte[2], 16)
+                if len(splitByte) > 4 and reUnicodeEscape.match(splitByte):
+                    pieces.append(
+                        chr(int(splitByte[3:5], 16)) + chr(int(splitByte[1:3], 16))
                     )
-                    if len(splitByte) > 5:
-                        for j in range(5, len(splitByte)):
-                            unescapedBytes += splitByte[j] + unicodePadding
-                elif len(splitByte) > 1 and re.match(
-                    "[0-9a-f]{2}", splitByte[:2], re.IGNORECASE
-                ):
-                    unescapedBytes += (
-                        chr(int(splitByte[0] + splitByte[1], 16)) + unicodePadding
-                    )
-                    if len(splitByte) > 2:
-                        for j in range(2, len(splitByte)):
-                            unescapedBytes += splitByte[j] + unicodePadding
+                    remainder = splitByte[5:]
+                elif len(splitByte) > 1 and reHexEscape.match(splitByte):
+                    pieces.append(chr(int(splitByte[:2], 16)) + unicodePadding)
+                    remainder = splitByte[2:]
                 else:
                     if k != 0:
-                        unescapedBytes += "%" + unicodePadding
-                    for _, v in enumerate(splitByte):
-                        unescapedBytes += v + unicodePadding
+                        pieces.append("%" + unicodePadding)
+                    remainder = splitByte
+                if remainder:
+                    pieces.append(unicodePadding.join(remainder) + unicodePadding)
+            unescapedBytes = "".join(pieces)
         else:
             unescapedBytes = escapedBytes
     except:
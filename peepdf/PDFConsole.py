@@ -24,16 +24,19 @@
 """
 
 import cmd
+import gc
 import sys
 import os
 import re
 import hashlib
+import mmap
 import traceback
 import pathlib
 from base64 import b64encode, b64decode
 from datetime import datetime as dt
 from builtins import input
 import jsbeautifier
+import requests
 from prettytable import PrettyTable, SINGLE_BORDER
 
 try:
@@ -41,10 +44,11 @@ try:
         getBytesFromFile,
         countArrayElements,
         clearScreen,
-        hexToString,
         escapeRegExpString,
         vtcheck,
         countNonPrintableChars,
+        printableTable,
+        stringToBytes,
         getPeepXML,
         getPeepJSON,
     )
@@ -75,10 +79,11 @@ except ModuleNotFoundError:
         getBytesFromFile,
         countArrayElements,
         clearScreen,
-        hexToString,
         escapeRegExpString,
         vtcheck,
         countNonPrintableChars,
+        printableTable,
+        stringToBytes,
         getPeepXML,
         getPeepJSON,
     )
@@ -144,8 +149,71 @@ FILE_WRITE = 1
 FILE_ADD = 2
 VAR_WRITE = 3
 VAR_ADD = 4
+# Redirection symbols, longest first so they can be checked as prefixes in order
+REDIRECTIONS = (
+    ("$>>", VAR_ADD),
+    ("$>", VAR_WRITE),
+    (">>", FILE_ADD),
+    (">", FILE_WRITE),
+)
+REDIRECT_SYMBOLS = dict(REDIRECTIONS)
 DTFMT = "%Y%m%d-%H%M%S"
+OFFSETS_SEPARATOR = f'{"-" * 9}\t{"-" * 9}\t{"-" * 9}\t{"-" * 20}'
 newLine = os.linesep
+reListValue = re.compile(r"\[.*\]")
+reHexSearch = re.compile(r"(\\x[0-9a-fA-F]{1,2})+")
+reHexPadding = re.compile(r"\\x([0-9a-fA-F])(?![0-9a-fA-F])")
+reXorKey = re.compile("[0-9a-f]{1,2}")
+reOctalEscape = re.compile(r"\\(\d{1,3})", re.DOTALL)
+reReference = re.compile(r"\d{1,10}\s\d{1,10}\sR", re.IGNORECASE)
+reRegExpChars = re.compile(rb"[.^$*+?{}\[\]\\|()]")
+reNewLines = re.compile(r"\r\n?")
+# Arguments quoted with ''', ' or ", unquoted arguments, spaces or an unclosed quote
+reArgument = re.compile(
+    r"""'''(.*?)'''|'(?!'')([^']*)'|"([^"]*)"|([^ '"][^ ]*)| +|(.)""", re.DOTALL
+)
+# Characters which cannot appear in a name object without being escaped
+nameInvalidChars = frozenset(spacesChars + delimiterChars)
+# Static prompts used while creating and modifying objects interactively
+STRING_TYPE_PROMPT = (
+    f"{newLine}Do you want to enter an ascii (1) or hexadecimal (2) string? (1/2) "
+)
+STREAM_CONTENT_PROMPT = (
+    f"{newLine}Please specify the stream content "
+    f"(if the content includes EOL characters use a file instead): {newLine * 2}"
+)
+MODIFY_PROMPT = f"{newLine}Do you want to modify, delete or make no action? (m/d/n) "
+MODIFY_STREAM_PROMPT = (
+    f"{newLine}Do you want to modify, delete or make no action in the STREAM? (m/d/n) "
+)
+ADD_OBJECTS_PROMPT = f"{newLine}Do you want to add more objects? (y/n) "
+ADD_ENTRIES_PROMPT = f"{newLine}Do you want to add more entries? (y/n) "
+OBJECT_TYPE_PROMPT = (
+    f"What type of object do you want to include? (1-9) {newLine}"
+    f"\t1 - boolean {newLine}"
+    f"\t2 - number {newLine}"
+    f"\t3 - string {newLine}"
+    f"\t4 - hexstring {newLine}"
+    f"\t5 - name {newLine}"
+    f"\t6 - reference {newLine}"
+    f"\t7 - null {newLine}"
+    f"\t8 - array {newLine}"
+    f"\t9 - dictionary {newLine}"
+)
+# Commands which can change the objects of the document and invalidate the cached results
+MODIFYING_COMMANDS = {
+    "create",
+    "decrypt",
+    "embed",
+    "encode_strings",
+    "encrypt",
+    "filters",
+    "modify",
+    "open",
+    "replace",
+    "save",
+    "save_version",
+}
 filter2RealFilterDict = {
     "b64": "base64",
     "base64": "base64",
@@ -231,6 +299,8 @@ class PDFConsole(cmd.Cmd):
         self.javaScriptContexts = {"global": None}
         self.readOnlyVariables = ["malformed_options", "header_file"]
         self.loggingFile = None
+        self.logFile = None
+        self.vtSession = None
         self.output = None
         self.redirect = None
         self.leaving = False
@@ -238,16 +308,39 @@ class PDFConsole(cmd.Cmd):
         self.jsonOutput = jsonOutput
         self.outputVarName = None
         self.outputFileName = None
+        self.referencesCache = {}
+        self.referencesIndex = {}
+        self.treeCache = {}
 
     def emptyline(self):
         return
 
+    def onecmd(self, line):
+        # A command can fail after modifying the document, so the caches are
+        # invalidated and the log flushed even if it raises an exception
+        try:
+            return cmd.Cmd.onecmd(self, line)
+        finally:
+            if self.parseline(line)[0] in MODIFYING_COMMANDS:
+                self.referencesCache = {}
+                self.referencesIndex = {}
+                self.treeCache = {}
+            if self.logFile is not None:
+                self.logFile.flush()
+
     def precmd(self, line):
         if line == "EOF":
             return "exit"
         return line
 
     def postloop(self):
+        if self.logFile is not None:
+            self.logFile.close()
+            self.logFile = None
+            self.loggingFile = None
+        if self.vtSession is not None:
+            self.vtSession.close()
+            self.vtSession = None
         if self.use_rawinput:
             print(f"{newLine}[+] Leaving the Peepdf interactive console{newLine}")
         self.leaving = True
@@ -1287,7 +1380,7 @@ class PDFConsole(cmd.Cmd):
             self.help_errors()
             return False
         thisId = args[0]
-        if (not thisId.isdigit() and thisId != "trailer" and thisId != "xref") or (
+        if (not thisId.isdigit() and thisId not in {"trailer", "xref"}) or (
             version is not None and not version.isdigit()
         ):
             self.help_errors()
@@ -1457,17 +1550,14 @@ class PDFConsole(cmd.Cmd):
                     return False
                 filters.append(thisFilter)
 
-        thisId = args[0]
-        if not thisId.isdigit() or (version is not None and not version.isdigit()):
-            self.help_filters()
+        ret = self.parseIdVersion(args[0], version)
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_filters()
+            else:
+                self.log_output("filters " + argv, ret[1])
             return False
-        thisId = int(thisId)
-        if version is not None:
-            version = int(version)
-            if version > self.pdfFile.getNumUpdates():
-                message = "[!] Error: The version number is not valid"
-                self.log_output("filters " + argv, message)
-                return False
+        thisId, version = ret[1]
 
         obj = self.pdfFile.getObject(thisId, version)
         if obj is None:
@@ -1893,7 +1983,7 @@ class PDFConsole(cmd.Cmd):
             self.help_info()
             return False
         thisId = args[0]
-        if (not thisId.isdigit() and thisId != "trailer" and thisId != "xref") or (
+        if (not thisId.isdigit() and thisId not in {"trailer", "xref"}) or (
             version is not None and not version.isdigit()
         ):
             self.help_info()
@@ -2376,17 +2466,14 @@ class PDFConsole(cmd.Cmd):
         else:
             self.help_js_code()
             return False
-        thisId = args[0]
-        if not thisId.isdigit() or (version is not None and not version.isdigit()):
-            self.help_js_code()
+        ret = self.parseIdVersion(args[0], version)
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_js_code()
+            else:
+                self.log_output("js_code " + argv, ret[1])
             return False
-        thisId = int(thisId)
-        if version is not None:
-            version = int(version)
-            if version > self.pdfFile.getNumUpdates():
-                message = "[!] Error: The version number is not valid"
-                self.log_output("js_code " + argv, message)
-                return False
+        thisId, version = ret[1]
         obj = self.pdfFile.getObject(thisId, version)
         if obj is None:
             message = "[!] Error: Object not found"
@@ -2821,15 +2908,18 @@ class PDFConsole(cmd.Cmd):
                 return False
             content = self.variables[src][0]
         elif srcType == "file":
-            if not os.path.exists(src):
+            try:
+                with open(src, "rb") as srcFile:
+                    content = srcFile.read().decode("latin-1")
+            except FileNotFoundError:
                 message = "[!] Error: The file does not exist"
                 self.log_output("js_unescape " + argv, message)
                 return False
-            with open(src, "rb") as srcFile:
-                content = srcFile.read()
         else:
             content = src
         if (
+            "%" not in content and "\\u" not in content and "\\U" not in content
+        ) or (
             re.findall(reUnicodeChars, content, re.IGNORECASE) == []
             and re.findall(reHexChars, content, re.IGNORECASE) == []
         ):
@@ -2975,9 +3065,19 @@ class PDFConsole(cmd.Cmd):
                 print(f"{newLine}Log file: {self.loggingFile}{newLine}")
         elif numArgs == 1:
             param = args[0]
+            if self.logFile is not None:
+                self.logFile.close()
+                self.logFile = None
             if param == "stop":
                 self.loggingFile = None
             else:
+                try:
+                    self.logFile = open(param, "ab", buffering=1 << 16)
+                except OSError:
+                    self.loggingFile = None
+                    message = "[!] Error: The log file cannot be opened"
+                    self.log_output("log " + argv, message)
+                    return False
                 self.loggingFile = param
         else:
             self.help_log()
@@ -3047,7 +3147,6 @@ class PDFConsole(cmd.Cmd):
             message = "[!] Error: You must open a file"
             self.log_output("metadata " + argv, message)
             return False
-        output = ""
         args = self.parseArgs(argv)
         if args is None:
             message = "[!] Error: The command line arguments have not been parsed successfully"
@@ -3072,30 +3171,14 @@ class PDFConsole(cmd.Cmd):
         metadataObjects = self.pdfFile.getMetadata(version)
         if metadataObjects not in ([], [[]]):
             if version is not None:
-                metadataObjects = [metadataObjects]
-            for k, v in enumerate(metadataObjects):
-                objects = v
-                if version is not None:
-                    k = version
-                infoObject = self.pdfFile.getInfoObject(k)
-                if infoObject is not None:
-                    value = infoObject.getValue()
-                    output += f"Info Object in version {str(k)}: {newLine * 2}{value}{newLine * 2}"
-                if objects:
-                    for thisId in objects:
-                        obj = self.pdfFile.getObject(thisId, k)
-                        objectType = obj.getType()
-                        if objectType in {"dictionary", "stream"}:
-                            subType = obj.getElementByName("/Type")
-                            if subType != []:
-                                subType = subType.getValue()
-                                if subType == "/Metadata":
-                                    value = obj.getValue()
-                                    if value != "":
-                                        output += (
-                                            f"Object {str(thisId)} in version {str(k)}:"
-                                            f" {newLine * 2}{value}{newLine * 2}"
-                                        )
+                output = self.formatMetadata(version, metadataObjects)
+            else:
+                output = "".join(
+                    [
+                        self.formatMetadata(k, objects)
+                        for k, objects in enumerate(metadataObjects)
+                    ]
+                )
             self.log_output("metadata " + argv, output)
         else:
             message = "[!] No metadata found"
@@ -3145,7 +3228,7 @@ class PDFConsole(cmd.Cmd):
         else:
             self.help_modify()
             return False
-        if (not thisId.isdigit() and thisId != "trailer" and thisId != "xref") or (
+        if (not thisId.isdigit() and thisId not in {"trailer", "xref"}) or (
             version is not None and not version.isdigit()
         ):
             self.help_modify()
@@ -3180,11 +3263,7 @@ class PDFConsole(cmd.Cmd):
                     streamContent = streamOut.read()
             else:
                 if self.use_rawinput:
-                    streamContent = input(
-                        f"{newLine}Please, specify the stream content"
-                        f"(if the content includes EOL characters use a file instead): "
-                        f"{newLine * 2}"
-                    )
+                    streamContent = input(STREAM_CONTENT_PROMPT)
                 else:
                     message = "[!] Error: In script mode you must specify a file storing the stream content"
                     self.log_output("modify " + argv, message)
@@ -3220,17 +3299,14 @@ class PDFConsole(cmd.Cmd):
         else:
             self.help_object()
             return False
-        thisId = args[0]
-        if not thisId.isdigit() or (version is not None and not version.isdigit()):
-            self.help_object()
+        ret = self.parseIdVersion(args[0], version)
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_object()
+            else:
+                self.log_output("object " + argv, ret[1])
             return False
-        thisId = int(thisId)
-        if version is not None:
-            version = int(version)
-            if version > self.pdfFile.getNumUpdates():
-                message = "[!] Error: The version number is not valid"
-                self.log_output("object " + argv, message)
-                return False
+        thisId, version = ret[1]
         obj = self.pdfFile.getObject(thisId, version)
         if obj is None:
             message = "[!] Error: Object not found"
@@ -3334,7 +3410,7 @@ class PDFConsole(cmd.Cmd):
             self.log_output("offsets " + argv, message)
             return False
         version = None
-        offsetsOutput = ""
+        offsetsOutput = []
         offsetsArray = []
         args = self.parseArgs(argv)
         if args is None:
@@ -3362,44 +3438,47 @@ class PDFConsole(cmd.Cmd):
         if version is not None:
             print(f"\rVersion {version}:")
         print(f"{newLine}Start (d)\tEnd (d)\t\tSize (d)\tType and Id\r")
-        print(f'{"-" * 9}\t{"-" * 9}\t{"-" * 9}\t{"-" * 20}\r')
+        print(f"{OFFSETS_SEPARATOR}\r")
+        append = offsetsOutput.append
+        nl = newLine
+        nl2 = newLine * 2
         for k, v in enumerate(offsetsArray):
             offsets = v
             if k == 0 and "header" in offsets:
                 offset, size = offsets["header"]
-                offsetsOutput += f"{offset:08d}\t\t\t\t\tHeader{newLine}"
+                append(f"{offset:08d}\t\t\t\t\tHeader{nl}")
             elif version is None:
-                offsetsOutput += f"{newLine}Version {str(k)}: {newLine * 2}"
+                append(f"{nl}Version {str(k)}: {nl2}")
             if "objects" in offsets:
                 compressedObjects = offsets["compressed"]
                 sortedObjectList = sorted(offsets["objects"], key=lambda x: x[1])
                 for thisId, offset, size in sortedObjectList:
                     if thisId in compressedObjects:
-                        offsetsOutput += (
+                        append(
                             f"{offset:08d}\t{((offset + size) - 1):08d}\t{size:08d}\t"
-                            f"Compressed Object {thisId} {newLine}"
+                            f"Compressed Object {thisId} {nl}"
                         )
                     else:
-                        offsetsOutput += (
+                        append(
                             f"{offset:08d}\t{((offset + size) - 1):08d}\t{size:08d}\t"
-                            f"Object {thisId} {newLine}"
+                            f"Object {thisId} {nl}"
                         )
             if offsets["xref"] is not None:
                 offset, size = offsets["xref"]
-                offsetsOutput += (
-                    f"{offset:08d}\t{((offset + size) -1):08d}\t{size:08d}\t"
-                    f"XrefSection {newLine}"
+                append(
+                    f"{offset:08d}\t{((offset + size) - 1):08d}\t{size:08d}\t"
+                    f"XrefSection {nl}"
                 )
             if offsets["trailer"] is not None:
                 offset, size = offsets["trailer"]
-                offsetsOutput += (
+                append(
                     f"{offset:08d}\t{((offset + size) - 1):08d}\t{size:08d}\t"
-                    f"Trailer {newLine}"
+                    f"Trailer {nl}"
                 )
             if offsets["eof"] is not None:
                 offset, size = offsets["eof"]
-                offsetsOutput += f"{offset:08d}\t\t\t\t\tEOF{newLine}"
-        self.log_output("offsets " + argv, offsetsOutput)
+                append(f"{offset:08d}\t\t\t\t\tEOF{nl}")
+        self.log_output("offsets " + argv, "".join(offsetsOutput))
 
     def help_offsets(self):
         print(f"{newLine}Usage: offsets [$version]")
@@ -3443,7 +3522,9 @@ class PDFConsole(cmd.Cmd):
             return False
 
         if self.pdfFile is not None:
-            del self.pdfFile
+            self.pdfFile.release()
+            self.pdfFile = None
+            gc.collect()
         pdfParser = PDFParser()
         ret = pdfParser.parse(fileName, forceMode, looseMode)
         if ret != -1:
@@ -3494,7 +3575,7 @@ class PDFConsole(cmd.Cmd):
             self.help_rawobject()
             return False
         thisId = args[0]
-        if (not thisId.isdigit() and thisId != "trailer" and thisId != "xref") or (
+        if (not thisId.isdigit() and thisId not in {"trailer", "xref"}) or (
             version is not None and not version.isdigit()
         ):
             self.help_rawobject()
@@ -3576,17 +3657,14 @@ class PDFConsole(cmd.Cmd):
         else:
             self.help_rawstream()
             return False
-        thisId = args[0]
-        if not thisId.isdigit() or (version is not None and not version.isdigit()):
-            self.help_rawstream()
+        ret = self.parseIdVersion(args[0], version)
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_rawstream()
+            else:
+                self.log_output("rawstream " + argv, ret[1])
             return False
-        thisId = int(thisId)
-        if version is not None:
-            version = int(version)
-            if version > self.pdfFile.getNumUpdates():
-                message = "[!] Error: The version number is not valid"
-                self.log_output("stream " + argv, message)
-                return False
+        thisId, version = ret[1]
         obj = self.pdfFile.getObject(thisId, version)
         if obj is None:
             message = "[!] Error: Object not found"
@@ -3622,26 +3700,36 @@ class PDFConsole(cmd.Cmd):
         else:
             self.help_references()
             return False
-        command = args[0]
-        thisId = args[1]
-        if (
-            not thisId.isdigit()
-            or (version is not None and not version.isdigit())
-            or (command.lower() != "to" and command.lower() != "in")
-        ):
+        command = args[0].lower()
+        if command not in {"to", "in"}:
             self.help_references()
             return False
-        thisId = int(thisId)
-        if version is not None:
-            version = int(version)
-            if version > self.pdfFile.getNumUpdates():
-                message = "[!] Error: The version number is not valid"
-                self.log_output("references " + argv, message)
-                return False
-        if command.lower() == "to":
-            references = self.pdfFile.getReferencesTo(thisId, version)
+        ret = self.parseIdVersion(args[1], version)
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_references()
+            else:
+                self.log_output("references " + argv, ret[1])
+            return False
+        thisId, version = ret[1]
+        cacheKey = (command, thisId, version)
+        if cacheKey in self.referencesCache:
+            references = self.referencesCache[cacheKey]
         else:
-            references = self.pdfFile.getReferencesIn(thisId, version)
+            if command == "to":
+                if version is None:
+                    versions = range(self.pdfFile.getNumUpdates() + 1)
+                else:
+                    versions = [version]
+                references = []
+                for v in versions:
+                    if v not in self.referencesIndex:
+                        self.referencesIndex[v] = self.pdfFile.getReferencesIndex(v)
+                    references += self.referencesIndex[v].get(str(thisId), [])
+                references.sort()
+            else:
+                references = self.pdfFile.getReferencesIn(thisId, version)
+            self.referencesCache[cacheKey] = references
         if not references:
             references = "No references"
         elif references is None:
@@ -3692,21 +3780,52 @@ class PDFConsole(cmd.Cmd):
             string1 = args[2]
             string2 = args[3]
             if srcType == "file":
-                if not os.path.exists(src):
+                if not string1:
+                    message = "[!] Error: The string to be replaced cannot be empty"
+                    self.log_output("replace " + argv, message)
+                    return False
+                searchBytes = stringToBytes(string1)
+                replaceBytes = stringToBytes(string2)
+                stringFound = False
+                newContent = None
+                try:
+                    # The file is only opened for writing if the string is found
+                    with open(src, "rb") as srcFile:
+                        if os.fstat(srcFile.fileno()).st_size > 0:
+                            with mmap.mmap(
+                                srcFile.fileno(), 0, access=mmap.ACCESS_READ
+                            ) as content:
+                                stringFound = content.find(searchBytes) != -1
+                    if stringFound:
+                        with open(src, "r+b") as srcFile:
+                            # Same length replacements are written in place
+                            with mmap.mmap(srcFile.fileno(), 0) as content:
+                                if len(searchBytes) == len(replaceBytes):
+                                    index = content.find(searchBytes)
+                                    while index != -1:
+                                        content[
+                                            index : index + len(replaceBytes)
+                                        ] = replaceBytes
+                                        index = content.find(
+                                            searchBytes, index + len(searchBytes)
+                                        )
+                                else:
+                                    newContent = content[:].replace(
+                                        searchBytes, replaceBytes
+                                    )
+                            if newContent is not None:
+                                srcFile.seek(0)
+                                srcFile.write(newContent)
+                                srcFile.truncate()
+                except FileNotFoundError:
                     message = "[!] Error: The file does not exist"
                     self.log_output("replace " + argv, message)
                     return False
-                with open(src, "rb") as srcFile:
-                    content = srcFile.read()
-                if content.find(string1) != -1:
-                    replaceOutput = content.replace(string1, string2)
-                    try:
-                        with open(src, "wb") as outSrc:
-                            outSrc.write(replaceOutput)
-                    except:
-                        message = "[!] Error: The file cannot be modified"
-                        self.log_output("replace " + argv, message)
-                        return False
+                except:
+                    message = "[!] Error: The file cannot be modified"
+                    self.log_output("replace " + argv, message)
+                    return False
+                if stringFound:
                     message = "[+] The string has been replaced correctly"
                 else:
                     message = "String not found"
@@ -3747,15 +3866,12 @@ class PDFConsole(cmd.Cmd):
             var = args[0]
             if var in self.variables:
                 self.variables[var][0] = self.variables[var][1]
-                if var == "output" and (
-                    self.variables[var][0] == "file"
-                    or self.variables[var][0] == "variable"
-                ):
+                if var == "output" and self.variables[var][0] in {"file", "variable"}:
                     message = f'{var} = "{self.output}" ({str(self.variables[var][0])})'
                 else:
                     varContent = self.printResult(str(self.variables[var][0]))
                     if varContent == str(self.variables[var][0]):
-                        if varContent != "None" and not re.match("\[.*\]", varContent):
+                        if varContent != "None" and not reListValue.match(varContent):
                             message = f'{var} = "{varContent}"'
                         else:
                             message = f"{var} = {varContent}"
@@ -3923,14 +4039,15 @@ class PDFConsole(cmd.Cmd):
                 message = "[!] Error: The variable does not exist"
                 self.log_output("sctest " + argv, message)
                 return False
-            byteVal = self.variables[src][0]
+            byteVal = stringToBytes(self.variables[src][0])
         elif srcType == "file":
-            if not os.path.exists(src):
+            try:
+                with open(src, "rb") as srcFile:
+                    byteVal = srcFile.read()
+            except FileNotFoundError:
                 message = "[!] Error: The file does not exist"
                 self.log_output("sctest " + argv, message)
                 return False
-            with open(src, "rb") as srcFile:
-                byteVal = srcFile.read()
         else:
             ret = getBytesFromFile(self.pdfFile.getPath(), offset, size)
             if ret[0] == -1:
@@ -3987,20 +4104,16 @@ class PDFConsole(cmd.Cmd):
                 self.help_search()
                 return False
             toSearch = args[1]
-            if re.match("(\\\\x[0-9a-f]{1,2})+", toSearch):
-                hexChars = toSearch.split("\\x")
-                hexChars.remove("")
-                toSearch = ""
-                for hexChar in hexChars:
-                    if len(hexChar) == 1:
-                        hexChar = "0" + hexChar
-                    toSearch += hexChar
-                ret = hexToString(toSearch)
-                if ret[0] == -1:
-                    message = f"[!] Error: {ret[1]}"
+            if reHexSearch.match(toSearch):
+                toSearch = reHexPadding.sub(r"\\x0\1", toSearch)
+                try:
+                    toSearch = bytes.fromhex(toSearch.replace("\\x", "")).decode(
+                        "latin-1"
+                    )
+                except ValueError:
+                    message = "[!] Error: Error in hexadecimal conversion"
                     self.log_output("search " + argv, message)
                     return False
-                toSearch = ret[1]
             else:
                 message = "[!] Error: Bad hexadecimal string"
                 self.log_output("search " + argv, message)
@@ -4016,15 +4129,16 @@ class PDFConsole(cmd.Cmd):
                 else:
                     output = str(objects[0])
             else:
+                versionsOutput = []
                 for version, result in enumerate(objects):
                     if result:
-                        output += (
+                        versionsOutput.append(
                             f"{newLine}Version {str(version)}: {str(result)}{newLine}"
                         )
-                if output == "":
+                if not versionsOutput:
                     output = "Not found"
                 else:
-                    output = output[1:-1]
+                    output = "".join(versionsOutput)[1:-1]
         self.log_output("search " + argv, output)
 
     def help_search(self):
@@ -4035,7 +4149,7 @@ class PDFConsole(cmd.Cmd):
         print(f"Example: search hex \\x34\\x35 {newLine}")
 
     def do_set(self, argv):
-        consoleOutput = ""
+        consoleOutput = []
         args = self.parseArgs(argv)
         if args is None:
             message = "[!] Error: The command line arguments have not been parsed successfully"
@@ -4046,21 +4160,21 @@ class PDFConsole(cmd.Cmd):
             self.help_set()
             return False
         if numArgs == 0:
-            allVars = list(self.variables.keys())
-            for var in allVars:
-                varContent = self.printResult(str(self.variables[var][0]))
-                if varContent == str(self.variables[var][0]):
+            for var in self.variables:
+                value = str(self.variables[var][0])
+                varContent = self.printResult(value)
+                if varContent == value:
                     if (
                         varContent != "None"
-                        and not re.match("\[.*\]", varContent)
+                        and not reListValue.match(varContent)
                         and not varContent.isdigit()
                     ):
-                        consoleOutput += f'{var} = "{varContent}" {newLine}'
+                        consoleOutput.append(f'{var} = "{varContent}" {newLine}')
                     else:
-                        consoleOutput += f"{var} = {str(varContent)} {newLine}"
+                        consoleOutput.append(f"{var} = {str(varContent)} {newLine}")
                 else:
-                    consoleOutput += f"{var} =  {newLine}{varContent}{newLine}"
-            print(f"{newLine}{consoleOutput}")
+                    consoleOutput.append(f"{var} =  {newLine}{varContent}{newLine}")
+            print(f"{newLine}{''.join(consoleOutput)}")
         else:
             varName = args[0]
             value = args[1]
@@ -4155,17 +4269,14 @@ class PDFConsole(cmd.Cmd):
         else:
             self.help_stream()
             return False
-        thisId = args[0]
-        if not thisId.isdigit() or (version is not None and not version.isdigit()):
-            self.help_stream()
+        ret = self.parseIdVersion(args[0], version)
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_stream()
+            else:
+                self.log_output("stream " + argv, ret[1])
             return False
-        thisId = int(thisId)
-        if version is not None:
-            version = int(version)
-            if version > self.pdfFile.getNumUpdates():
-                message = "[!] Error: The version number is not valid"
-                self.log_output("stream " + argv, message)
-                return False
+        thisId, version = ret[1]
         obj = self.pdfFile.getObject(thisId, version)
         if obj is None:
             message = "[!] Error: Object not found"
@@ -4237,7 +4348,7 @@ class PDFConsole(cmd.Cmd):
             self.log_output("version " + argv, message)
             return False
         version = None
-        treeOutput = ""
+        treeOutput = []
         tree = []
         args = self.parseArgs(argv)
         if args is None:
@@ -4245,9 +4356,7 @@ class PDFConsole(cmd.Cmd):
             self.log_output("tree " + argv, message)
             return False
         numArgs = len(args)
-        if numArgs == 0:
-            tree = self.pdfFile.getTree()
-        elif numArgs == 1:
+        if numArgs == 1:
             version = args[0]
             if version is not None and not version.isdigit():
                 message = "[!] Error: The version number is not valid"
@@ -4258,27 +4367,31 @@ class PDFConsole(cmd.Cmd):
                 message = "[!] Error: The version number is not valid"
                 self.log_output("tree " + argv, message)
                 return False
-            tree = self.pdfFile.getTree(version)
-        else:
+        elif numArgs > 1:
             self.help_tree()
             return False
+        if version in self.treeCache:
+            self.log_output("tree " + argv, self.treeCache[version])
+            return
+        tree = self.pdfFile.getTree(version)
         for k, v in enumerate(tree):
-            nodesPrinted = []
+            nodesPrinted = set()
             root = v[0]
             objectsInfo = v[1]
             if k != 0:
-                treeOutput += f"{newLine}Version {str(k)}: {newLine * 2}"
+                treeOutput.append(f"{newLine}Version {str(k)}: {newLine * 2}")
             if root is not None:
                 nodesPrinted, nodeOutput = self.printTreeNode(
                     root, objectsInfo, nodesPrinted
                 )
-                treeOutput += nodeOutput
+                treeOutput.append(nodeOutput)
             for obj in objectsInfo:
                 nodesPrinted, nodeOutput = self.printTreeNode(
                     obj, objectsInfo, nodesPrinted
                 )
-                treeOutput += nodeOutput
-        self.log_output("tree " + argv, treeOutput)
+                treeOutput.append(nodeOutput)
+        self.treeCache[version] = "".join(treeOutput)
+        self.log_output("tree " + argv, self.treeCache[version])
 
     def help_tree(self):
         print(f"{newLine}Usage: tree [$version]")
@@ -4288,6 +4401,9 @@ class PDFConsole(cmd.Cmd):
         content = ""
         srcName = ""
         thisId = ""
+        version = None
+        offset = None
+        size = None
         validTypes = [
             "variable",
             "file",
@@ -4298,7 +4414,8 @@ class PDFConsole(cmd.Cmd):
             "rawstream",
         ]
         # Checking if a VirusTotal API key has been defined
-        if "yourAPIkey" in self.variables["vt_key"][0]:
+        vtKey = self.variables["vt_key"][0]
+        if not vtKey or "yourAPIkey" in vtKey:
             message = (
                 f'[!] Error: The "vt_key" variable has not been set! You need to use your own VirusTotal API key. {newLine * 2}'
                 f'Define the variable "vt_key": set vt_key "ENTER_YOUR_API_KEY"{newLine}'
@@ -4321,7 +4438,7 @@ class PDFConsole(cmd.Cmd):
                 if args[0] in {"object", "rawobject", "stream", "rawstream"}:
                     thisId = args[1]
                     version = None
-                elif args[0] == "file" or args[0] == "variable":
+                elif args[0] in {"file", "variable"}:
                     srcName = args[1]
                 else:
                     self.help_vtcheck()
@@ -4344,83 +4461,59 @@ class PDFConsole(cmd.Cmd):
             if srcType not in validTypes:
                 self.help_vtcheck()
                 return False
-            if srcType == "variable":
-                if srcName not in self.variables:
-                    message = "[!] Error: The variable does not exist"
-                    self.log_output("vtcheck " + argv, message)
-                    return False
-                content = self.variables[srcName][0]
-            elif srcType == "file":
-                if not os.path.exists(srcName):
+            if srcType == "file":
+                try:
+                    with open(srcName, "rb") as srcFile:
+                        if os.path.getsize(srcName) > 0:
+                            # The file is hashed from the mapping instead of being read
+                            with mmap.mmap(
+                                srcFile.fileno(), 0, access=mmap.ACCESS_READ
+                            ) as content:
+                                md5Hash = hashlib.md5(content).hexdigest()
+                        else:
+                            md5Hash = hashlib.md5(b"").hexdigest()
+                except FileNotFoundError:
                     message = "[!] Error: The file does not exist"
                     self.log_output("vtcheck " + argv, message)
                     return False
-                with open(srcName, "rb") as srcFile:
-                    content = srcFile.read()
             else:
-                if self.pdfFile is None:
-                    message = "[!] Error: You must open a file"
-                    self.log_output("vtcheck " + argv, message)
-                    return False
-                if srcType == "raw":
-                    if not offset.isdigit() or not size.isdigit():
-                        self.help_vtcheck()
-                        return False
-                    offset = int(offset)
-                    size = int(size)
-                    ret = getBytesFromFile(self.pdfFile.getPath(), offset, size)
-                    if ret[0] == -1:
-                        message = "[!] Error: The file does not exist"
-                        self.log_output("vtcheck " + argv, message)
-                        return False
-                    content = ret[1]
-                else:
-                    if not thisId.isdigit() or (
-                        version is not None and not version.isdigit()
-                    ):
+                ret = self.getSourceContent(
+                    srcType,
+                    srcName=srcName,
+                    thisId=thisId,
+                    version=version,
+                    offset=offset,
+                    size=size,
+                )
+                if ret[0] == -1:
+                    if ret[1] is None:
                         self.help_vtcheck()
-                        return False
-                    thisId = int(thisId)
-                    if version is not None:
-                        version = int(version)
-                        if version > self.pdfFile.getNumUpdates():
-                            message = "[!] Error: The version number is not valid"
-                            self.log_output("vtcheck " + argv, message)
-                            return False
-                    obj = self.pdfFile.getObject(thisId, version)
-                    if obj is None:
-                        message = "[!] Error: Object not found"
-                        self.log_output("vtcheck " + argv, message)
-                        return False
-                    if srcType in {"stream", "rawstream"}:
-                        if obj.getType() != "stream":
-                            message = "[!] Error: The object doesn't contain any stream"
-                            self.log_output("vtcheck " + argv, message)
-                            return False
-                        if srcType == "stream":
-                            content = obj.getStream()
-                        else:
-                            content = obj.getRawStream()
-                    elif srcType == "object":
-                        content = obj.getValue()
                     else:
-                        content = obj.getRawValue()
-            content = str(content)
-            md5Hash = hashlib.md5(content.encode()).hexdigest()
+                        self.log_output("vtcheck " + argv, ret[1])
+                    return False
+                content = ret[1]
+                if isinstance(content, str):
+                    content = content.encode()
+                md5Hash = hashlib.md5(content).hexdigest()
         # Checks the MD5 on VirusTotal
-        ret = vtcheck(md5Hash, self.variables["vt_key"][0])
+        # The session keeps the connection to VirusTotal open between checks
+        if self.vtSession is None:
+            self.vtSession = requests.Session()
+        ret = vtcheck(md5Hash, vtKey, self.vtSession)
         if ret[0] == -1:
 
             message = f"[!] Error: {ret[1]} on VirusTotal"
             self.log_output("vtcheck " + argv, message)
             return False
         jsonDict = ret[1]
-        maliciousCount = jsonDict["data"]["attributes"]["last_analysis_stats"][
-            "malicious"
-        ]
-        totalCount = 0
-        for result in ("harmless", "suspicious", "malicious", "undetected"):
-            totalCount += jsonDict["data"]["attributes"]["last_analysis_stats"][result]
+        analysisStats = jsonDict["data"]["attributes"]["last_analysis_stats"]
+        maliciousCount = analysisStats["malicious"]
+        totalCount = (
+            analysisStats["harmless"]
+            + analysisStats["suspicious"]
+            + maliciousCount
+            + analysisStats["undetected"]
+        )
         if (
             "last_analysis_date" in jsonDict["data"]["attributes"]
             and "last_analysis_results" in jsonDict["data"]["attributes"]
@@ -4440,19 +4533,21 @@ class PDFConsole(cmd.Cmd):
                     detectionColor = self.alertColor
                 elif detectionLevel >= 1:
                     detectionColor = self.warningColor
-            output = (
+            output = [
                 f"{self.staticColor}Detection rate: {self.resetColor}{detectionColor}"
                 f"{maliciousCount}{self.resetColor}/{totalCount}{newLine}"
                 f"{self.staticColor}Last analysis date: {self.resetColor}"
                 f"{lastAnalysisDate}{newLine}"
                 f"{self.staticColor}Report link: {self.resetColor}"
                 f"{selfLink}{newLine}"
-            )
+            ]
             if maliciousCount > 0:
 
                 if len(jsonDict["data"]["attributes"]["names"]) > 0:
-                    output += f"{self.staticColor}Names: {self.resetColor}{', '.join(jsonDict['data']['attributes']['names'])}{newLine}"
-                output += (
+                    output.append(
+                        f"{self.staticColor}Names: {self.resetColor}{', '.join(jsonDict['data']['attributes']['names'])}{newLine}"
+                    )
+                output.append(
                     f"{self.staticColor}Scan results: {self.resetColor}{newLine * 2}"
                 )
                 scan_list = []
@@ -4487,16 +4582,19 @@ class PDFConsole(cmd.Cmd):
                 table.sortby = f"{self.staticColor}Engine{self.resetColor}"
                 if len(scan_list) > 1:
                     table.add_rows(scan_list[1:])
-                output += str(table)
+                output.append(str(table))
             elif maliciousCount == 0:
-                output += (
+                output.append(
                     f"{self.staticColor}Scan results: {self.resetColor}{newLine * 2}"
                 )
-                output += f"{self.staticColor}No malicious detection for {md5Hash}{self.resetColor}."
+                output.append(
+                    f"{self.staticColor}No malicious detection for {md5Hash}{self.resetColor}."
+                )
             else:
                 message = "[!] Error: Missing elements in the response from VirusTotal"
                 self.log_output("vtcheck " + argv, message)
                 return False
+            output = "".join(output)
         elif args == []:
             self.pdfFile.setDetectionRate(None)
             output = "File not found on VirusTotal!"
@@ -4557,6 +4655,9 @@ class PDFConsole(cmd.Cmd):
         content = ""
         srcName = ""
         thisId = ""
+        version = None
+        offset = None
+        size = None
         validTypes = ["variable", "file", "raw", "stream", "rawstream"]
         args = self.parseArgs(argv)
         if not args:
@@ -4615,84 +4716,44 @@ class PDFConsole(cmd.Cmd):
         if key is not None:
             key = key.replace("0x", "")
             key = key.replace("\\x", "")
-            match = re.match("[0-9a-f]{1,2}", key)
-            if not match or match.group() != key:
+            if not reXorKey.fullmatch(key):
                 message = (
                     "[!] Error: The key must be an hexadecimal digit (0x5,0xa1,0x2f...)"
                 )
                 self.log_output("xor " + argv, message)
                 return False
             key = chr(int(key, 16))
-        if srcType == "variable":
-            if srcName not in self.variables:
-                message = "[!] Error: The variable does not exist"
-                self.log_output("xor " + argv, message)
-                return False
-            content = self.variables[srcName][0]
-        elif srcType == "file":
-            if not os.path.exists(srcName):
-                message = "[!] Error: The file does not exist"
-                self.log_output("xor " + argv, message)
-                return False
-            with open(srcName, "rb") as srcFile:
-                content = srcFile.read()
-        else:
-            if self.pdfFile is None:
-                message = "[!] Error: You must open a file"
-                self.log_output("xor " + argv, message)
-                return False
-            if srcType == "raw":
-                if not offset.isdigit() or not size.isdigit():
-                    self.help_xor()
-                    return False
-                offset = int(offset)
-                size = int(size)
-                ret = getBytesFromFile(self.pdfFile.getPath(), offset, size)
-                if ret[0] == -1:
-                    message = "[!] Error: The file does not exist"
-                    self.log_output("xor " + argv, message)
-                    return False
-                content = ret[1]
+        ret = self.getSourceContent(
+            srcType,
+            srcName=srcName,
+            thisId=thisId,
+            version=version,
+            offset=offset,
+            size=size,
+        )
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_xor()
             else:
-                if not thisId.isdigit() or (
-                    version is not None and not version.isdigit()
-                ):
-                    self.help_xor()
-                    return False
-                thisId = int(thisId)
-                if version is not None:
-                    version = int(version)
-                    if version > self.pdfFile.getNumUpdates():
-                        message = "[!] Error: The version number is not valid"
-                        self.log_output("xor " + argv, message)
-                        return False
-                obj = self.pdfFile.getObject(thisId, version)
-                if obj is None:
-                    message = "[!] Error: Object not found"
-                    self.log_output("xor " + argv, message)
-                    return False
-                if obj.getType() != "stream":
-                    message = "[!] Error: The object doesn't contain any stream"
-                    self.log_output("xor " + argv, message)
-                    return False
-                if srcType == "stream":
-                    content = obj.getStream()
-                else:
-                    content = obj.getRawStream()
+                self.log_output("xor " + argv, ret[1])
+            return False
+        content = ret[1]
 
-        content = str(content)
-        if content == "":
+        content = stringToBytes(content)
+        if content == b"":
             message = "[!] Warning: The content is empty"
             self.log_output("xor " + argv, message)
             return False
         if key is not None:
             output = xor(content, key)
         else:
-            output = ""
+            xoredOutput = []
             for i in range(256):
-                key = chr(i)
-                xored = xor(content, key)
-                output += f"[{hex(i)}] {newLine}{xored}{newLine}[/{hex(i)}] {newLine}"
+                hexKey = hex(i)
+                xoredOutput.append(f"[{hexKey}] {newLine}".encode())
+                xoredOutput.append(xor(content, chr(i)))
+                xoredOutput.append(f"{newLine}[/{hexKey}] {newLine}".encode())
+            output = b"".join(xoredOutput)
         self.log_output("xor " + argv, output, [output], bytesOutput=True)
 
     def help_xor(self):
@@ -4711,6 +4772,9 @@ class PDFConsole(cmd.Cmd):
         content = ""
         srcName = ""
         thisId = ""
+        version = None
+        offset = None
+        size = None
         found = False
         decValues = range(256)
         successfullKeys = {}
@@ -4722,10 +4786,10 @@ class PDFConsole(cmd.Cmd):
             self.log_output("xor_search " + argv, message)
             self.help_xor_search()
             return False
-        srcType = args[0]
-        if len(args) > 0 and srcType == "-i":
+        if len(args) > 0 and args[0] == "-i":
             caseSensitive = False
             args = args[1:]
+        srcType = args[0] if args else None
         if len(args) == 3:
             if srcType in {"stream", "rawstream"}:
                 thisId = args[1]
@@ -4754,90 +4818,92 @@ class PDFConsole(cmd.Cmd):
         if srcType not in validTypes:
             self.help_xor_search()
             return False
-        if srcType == "variable":
-            if srcName not in self.variables:
-                message = "[!] Error: The variable does not exist"
-                self.log_output("xor_search " + argv, message)
-                return False
-            content = self.variables[srcName][0]
-        elif srcType == "file":
-            if not os.path.exists(srcName):
-                message = "[!] Error: The file does not exist"
-                self.log_output("xor_search " + argv, message)
-                return False
-            with open(srcName, "rb") as srcFile:
-                content = srcFile.read()
-        else:
-            if self.pdfFile is None:
-                message = "[!] Error: You must open a file"
-                self.log_output("xor_search " + argv, message)
-                return False
-            if srcType == "raw":
-                if not offset.isdigit() or not size.isdigit():
-                    self.help_xor_search()
-                    return False
-                offset = int(offset)
-                size = int(size)
-                ret = getBytesFromFile(self.pdfFile.getPath(), offset, size)
-                if ret[0] == -1:
-                    message = "[!] Error: The file does not exist"
-                    self.log_output("xor_search " + argv, message)
-                    return False
-                content = ret[1]
+        ret = self.getSourceContent(
+            srcType,
+            srcName=srcName,
+            thisId=thisId,
+            version=version,
+            offset=offset,
+            size=size,
+        )
+        if ret[0] == -1:
+            if ret[1] is None:
+                self.help_xor_search()
             else:
-                if not thisId.isdigit() or (
-                    version is not None and not version.isdigit()
-                ):
-                    self.help_xor_search()
-                    return False
-                thisId = int(thisId)
-                if version is not None:
-                    version = int(version)
-                    if version > self.pdfFile.getNumUpdates():
-                        message = "[!] Error: The version number is not valid"
-                        self.log_output("xor_search " + argv, message)
-                        return False
-                obj = self.pdfFile.getObject(thisId, version)
-                if obj is None:
-                    message = "[!] Error: Object not found"
-                    self.log_output("xor_search " + argv, message)
-                    return False
-                if obj.getType() != "stream":
-                    message = "[!] Error: The object doesn't contain any stream"
-                    self.log_output("xor_search " + argv, message)
-                    return False
-                if srcType == "stream":
-                    content = obj.getStream()
-                else:
-                    content = obj.getRawStream()
+                self.log_output("xor_search " + argv, ret[1])
+            return False
+        content = ret[1]
 
-        content = str(content)
+        content = stringToBytes(content)
         if string == "":
             message = "[!] Error: The string cannot be empty"
             self.log_output("xor_search " + argv, message)
             return False
-        if content == "":
+        string = stringToBytes(string)
+        if content == b"":
             message = "[!] Warning: The content is empty"
             self.log_output("xor_search " + argv, message)
             return False
+        literal = not reRegExpChars.search(string)
+        if literal and caseSensitive and len(string) > 1:
+            # Two bytes xored with the same key keep the xor between them, so the
+            # differences of the string are searched once in the differences of the
+            # content and every hit gives a key from its first byte. The sweep only
+            # tries those keys, unless there are too many hits to be worth it.
+            contentDiff = (
+                int.from_bytes(content[:-1], "big") ^ int.from_bytes(content[1:], "big")
+            ).to_bytes(len(content) - 1, "big")
+            stringDiff = bytes(a ^ b for a, b in zip(string, string[1:]))
+            if contentDiff.count(stringDiff) <= 1024:
+                candidateKeys = set()
+                index = contentDiff.find(stringDiff)
+                while index != -1:
+                    candidateKeys.add(content[index] ^ string[0])
+                    index = contentDiff.find(stringDiff, index + 1)
+                decValues = sorted(candidateKeys)
+        elif literal and not caseSensitive:
+            caseVariants = [
+                (bytes([char]).lower(), bytes([char]).upper()) for char in string
+            ]
+        elif not literal:
+            try:
+                if caseSensitive:
+                    pattern = re.compile(string)
+                else:
+                    pattern = re.compile(string, re.IGNORECASE)
+            except re.error:
+                message = "[!] Error: The string is not a valid regular expression"
+                self.log_output("xor_search " + argv, message)
+                return False
         for i in decValues:
             key = chr(i)
-            xored = xor(content, key)
-            if caseSensitive:
-                matches = re.findall(string, xored)
+            if literal and caseSensitive:
+                # Looking for the xored string in the content finds the same offsets
+                # as looking for the string in the xored content, without xoring it
+                needle = xor(string, key)
+                offsets = []
+                index = content.find(needle)
+                while index != -1:
+                    offsets.append(index)
+                    index = content.find(needle, index + len(needle))
+            elif literal:
+                # Both cases of every character are xored, so the content is not
+                # xored or lowercased for each key
+                pattern = re.compile(
+                    b"".join(
+                        b"["
+                        + re.escape(xor(lower, key))
+                        + re.escape(xor(upper, key))
+                        + b"]"
+                        for lower, upper in caseVariants
+                    )
+                )
+                offsets = [match.start() for match in pattern.finditer(content)]
             else:
-                matches = re.findall(string, xored, re.IGNORECASE)
-            if matches != []:
+                xored = xor(content, key)
+                offsets = [match.start() for match in pattern.finditer(xored)]
+            if offsets:
                 found = True
-                auxXored = str(xored)
-                offsets = []
-                offset = 0
-                for m in matches:
-                    index = auxXored.find(m)
-                    offset += index
-                    offsets.append(offset)
-                    offset += len(m)
-                    auxXored = auxXored[index + len(m) :]
                 successfullKeys[hex(i)] = offsets
         if found:
             keys = list(successfullKeys.keys())
@@ -4872,11 +4938,7 @@ class PDFConsole(cmd.Cmd):
         @param isDict: Boolean to specify if the added object is a dictionary or not. Default value: False.
         @return: The response chosen by the user
         """
-        if not isDict:
-            message = f"{newLine}Do you want to add more objects? (y/n) "
-        else:
-            message = f"{newLine}Do you want to add more entries? (y/n) "
-        res = input(message)
+        res = input(ADD_ENTRIES_PROMPT if isDict else ADD_OBJECTS_PROMPT)
         if res.lower() in {"y", "n"}:
             return res.lower()
         return None
@@ -4902,19 +4964,7 @@ class PDFConsole(cmd.Cmd):
         }
         if iteration > maxDepth:
             return (-1, "Object too nested")
-        message = (
-            f"What type of object do you want to include? (1-9) {newLine}"
-            f"\t1 - boolean {newLine}"
-            f"\t2 - number {newLine}"
-            f"\t3 - string {newLine}"
-            f"\t4 - hexstring {newLine}"
-            f"\t5 - name {newLine}"
-            f"\t6 - reference {newLine}"
-            f"\t7 - null {newLine}"
-            f"\t8 - array {newLine}"
-            f"\t9 - dictionary {newLine}"
-        )
-        res = input(message)
+        res = input(OBJECT_TYPE_PROMPT)
         if not res.isdigit() or int(res) < 1 or int(res) > 9:
             return (-1, "Object type not valid")
         objectType = dictNumType[res]
@@ -4997,37 +5047,31 @@ class PDFConsole(cmd.Cmd):
             except:
                 return None
         elif objectType == "string":
-            octalNumbers = re.findall("\\\\(\d{1,3})", objectContent, re.DOTALL)
+            octalNumbers = reOctalEscape.findall(objectContent)
             for octal in octalNumbers:
                 try:
-                    chr(int(octal, 8))
-                except:
+                    int(octal, 8)
+                except ValueError:
                     return None
         elif objectType == "hexstring":
             objectContent = objectContent.replace("<", "")
             objectContent = objectContent.replace(">", "")
-            for i in range(0, len(objectContent), 2):
-                try:
-                    chr(int(objectContent[i : i + 2], 16))
-                except:
-                    return None
+            # White spaces are ignored and a missing final digit is taken as 0
+            hexDigits = "".join(objectContent.split())
+            if len(hexDigits) % 2 != 0:
+                hexDigits += "0"
+            try:
+                bytes.fromhex(hexDigits)
+            except ValueError:
+                return None
         elif objectType == "name":
             if objectContent[0] == "/":
                 objectContent = objectContent[1:]
-            for char in objectContent:
-                if char in spacesChars + delimiterChars:
-                    return None
-            hexNumbers = re.findall(
-                "#([0-9a-f]{2})", objectContent, re.DOTALL | re.IGNORECASE
-            )
-            for hexNumber in hexNumbers:
-                try:
-                    chr(int(hexNumber, 16))
-                except:
-                    return None
+            if not nameInvalidChars.isdisjoint(objectContent):
+                return None
             objectContent = "/" + objectContent
         elif objectType == "reference":
-            if not re.match("\d{1,10}\s\d{1,10}\sR", objectContent, re.IGNORECASE):
+            if not reReference.match(objectContent):
                 return None
             objectContent = objectContent.replace("r", "R")
         elif objectType == "null":
@@ -5036,6 +5080,91 @@ class PDFConsole(cmd.Cmd):
             objectContent = objectContent.lower()
         return objectContent
 
+    def formatMetadata(self, version: int, objects: list):
+        """
+        Method to get the metadata information of the specified version of the document
+
+        @param version: The version of the document
+        @param objects: List with the ids of the objects containing metadata in this version
+        @return: String with the Info object and the metadata objects of the version
+        """
+        output = []
+        getObject = self.pdfFile.getObject
+        infoObject = self.pdfFile.getInfoObject(version)
+        if infoObject is not None:
+            value = infoObject.getValue()
+            output.append(
+                f"Info Object in version {str(version)}: {newLine * 2}{value}{newLine * 2}"
+            )
+        for thisId in objects:
+            obj = getObject(thisId, version)
+            if obj.getType() in {"dictionary", "stream"}:
+                subType = obj.getElementByName("/Type")
+                if subType != [] and subType.getValue() == "/Metadata":
+                    value = obj.getValue()
+                    if value != "":
+                        output.append(
+                            f"Object {str(thisId)} in version {str(version)}:"
+                            f" {newLine * 2}{value}{newLine * 2}"
+                        )
+        return "".join(output)
+
+    def getSourceContent(
+        self,
+        srcType: str,
+        srcName: str = None,
+        thisId: str = None,
+        version: str = None,
+        offset: str = None,
+        size: str = None,
+    ):
+        """
+        Method to get the content of the source used by a command: a variable, a file, raw bytes of the document, an object or a stream
+
+        @param srcType: The type of source: variable, file, raw, object, rawobject, stream or rawstream
+        @param srcName: The name of the variable or the file
+        @param thisId: The id of the object
+        @param version: The version of the object or None if it has not been specified
+        @param offset: The offset of the raw bytes
+        @param size: The number of raw bytes
+        @return: A tuple (status,statusContent), where statusContent is the content in case status = 0, or in case status = -1 an error message or None if the arguments are not valid
+        """
+        if srcType == "variable":
+            if srcName not in self.variables:
+                return (-1, "[!] Error: The variable does not exist")
+            return (0, self.variables[srcName][0])
+        if srcType == "file":
+            try:
+                with open(srcName, "rb") as srcFile:
+                    return (0, srcFile.read())
+            except FileNotFoundError:
+                return (-1, "[!] Error: The file does not exist")
+        if self.pdfFile is None:
+            return (-1, "[!] Error: You must open a file")
+        if srcType == "raw":
+            if not offset.isdigit() or not size.isdigit():
+                return (-1, None)
+            ret = getBytesFromFile(self.pdfFile.getPath(), int(offset), int(size))
+            if ret[0] == -1:
+                return (-1, "[!] Error: The file does not exist")
+            return ret
+        ret = self.parseIdVersion(thisId, version)
+        if ret[0] == -1:
+            return ret
+        thisId, version = ret[1]
+        obj = self.pdfFile.getObject(thisId, version)
+        if obj is None:
+            return (-1, "[!] Error: Object not found")
+        if srcType == "object":
+            return (0, obj.getValue())
+        if srcType == "rawobject":
+            return (0, obj.getRawValue())
+        if obj.getType() != "stream":
+            return (-1, "[!] Error: The object doesn't contain any stream")
+        if srcType == "stream":
+            return (0, obj.getStream())
+        return (0, obj.getRawStream())
+
     def log_output(
         self,
         command: str,
@@ -5053,56 +5182,54 @@ class PDFConsole(cmd.Cmd):
         @param printOutput: Boolean to specify if the output will be written to the console or not. Default value: True.
         @param bytesOutput: Boolean to specify if we want to print raw bytes or not. Default value: False.
         """
-        if isinstance(output, bytes):
-            output = output.decode("latin-1")
-        errorIndex = output.find("[!] Error")
-        if errorIndex != -1:
-            output = (
-                output[:errorIndex]
-                + self.errorColor
-                + output[errorIndex:]
-                + self.resetColor
-            )
-        if bytesOutput and output != "":
-            niceOutput = self.printResult(output)
-        else:
-            niceOutput = output
-        niceOutput = niceOutput.strip(newLine)
-        niceOutput = niceOutput.replace("\r\n", "\n")
-        niceOutput = niceOutput.replace("\r", "\n")
-        longOutput = f"{command}{newLine * 2}{niceOutput}{newLine * 2}"
-        if self.loggingFile is not None:
-            if isinstance(longOutput, str):
-                longOutput = longOutput.encode()
-            with open(self.loggingFile, "ab") as logFile:
-                logFile.write("PPDF> " + longOutput)
+        # Raw bytes redirected to a file or variable are saved as they are, so the
+        # console representation is only built when it is going to be used
+        if not self.redirect or bytesToSave is None or self.logFile is not None:
+            if isinstance(output, bytes):
+                output = output.decode("latin-1")
+            errorIndex = output.find("[!] Error")
+            if errorIndex != -1:
+                output = (
+                    output[:errorIndex]
+                    + self.errorColor
+                    + output[errorIndex:]
+                    + self.resetColor
+                )
+            if bytesOutput and output != "":
+                niceOutput = self.printResult(output)
+            else:
+                niceOutput = output
+            niceOutput = reNewLines.sub("\n", niceOutput.strip(newLine))
+            longOutput = f"{command}{newLine * 2}{niceOutput}{newLine * 2}"
+            if self.logFile is not None:
+                self.logFile.write(f"PPDF> {longOutput}".encode())
         if self.redirect:
             if bytesToSave is None:
                 bytesToSave = [niceOutput]
-            for k, v in enumerate(bytesToSave):
-                byteVal = v
-                if (
-                    self.redirect in (FILE_WRITE, FILE_ADD)
-                ) and self.outputFileName is not None:
+            if (
+                self.redirect in (FILE_WRITE, FILE_ADD)
+            ) and self.outputFileName is not None:
+                fileName = str(self.outputFileName)
+                if self.redirect == FILE_WRITE:
+                    fileMode = "wb"
+                    action = "written to"
+                else:
+                    fileMode = "ab"
+                    action = "appended to"
+                for k, byteVal in enumerate(bytesToSave):
                     if k == 0:
-                        outFile = str(self.outputFileName)
+                        outFile = fileName
                     else:
-                        outFile = f"{str(self.outputFileName)}_{k}"
-                    if self.redirect == FILE_WRITE:
-                        if isinstance(byteVal, str):
-                            byteVal = byteVal.encode()
-                        with open(outFile, "wb") as outputContent:
-                            outputContent.write(byteVal)
-                        print(f"[+] Content has been written to file {outFile}")
-                    elif self.redirect == FILE_ADD:
-                        if isinstance(byteVal, str):
-                            byteVal = byteVal.encode()
-                        with open(outFile, "ab") as outputContent:
-                            outputContent.write(byteVal)
-                        print(f"[+] Content has been appended to file {outFile}")
-                elif (
-                    self.redirect in (VAR_WRITE, VAR_ADD)
-                ) and self.outputVarName is not None:
+                        outFile = f"{fileName}_{k}"
+                    if isinstance(byteVal, str):
+                        byteVal = byteVal.encode()
+                    with open(outFile, fileMode) as outputContent:
+                        outputContent.write(byteVal)
+                    print(f"[+] Content has been {action} file {outFile}")
+            elif (
+                self.redirect in (VAR_WRITE, VAR_ADD)
+            ) and self.outputVarName is not None:
+                for k, byteVal in enumerate(bytesToSave):
                     if k == 0:
                         varName = self.outputVarName
                     else:
@@ -5112,39 +5239,34 @@ class PDFConsole(cmd.Cmd):
                         print(f"[+] Content has been written to varaible {varName}")
                     elif self.redirect == VAR_ADD:
                         if varName in self.variables:
-                            self.variables[varName][0] += byteVal
-                            print(
-                                f"[+] Content has been appended to varaible {varName}"
-                            )
+                            # The new content takes the type of the stored value
+                            varValue = self.variables[varName][0]
+                            if isinstance(varValue, str) and isinstance(byteVal, bytes):
+                                byteVal = byteVal.decode("latin-1")
+                            elif isinstance(varValue, bytes) and isinstance(byteVal, str):
+                                byteVal = stringToBytes(byteVal)
+                            self.variables[varName][0] = varValue + byteVal
                         else:
                             self.variables[varName] = [byteVal, byteVal]
-                            print(
-                                f"[+] Content has been appended to varaible {varName}"
-                            )
+                        print(f"[+] Content has been appended to varaible {varName}")
         elif printOutput:
             if niceOutput:
                 niceOutput = f"{newLine}{niceOutput}{newLine}"
-                if (
-                    self.variables["output_limit"][0] is None
-                    or self.variables["output_limit"][0] == -1
-                    or not self.use_rawinput
-                ):
+                outputLimit = self.variables["output_limit"][0]
+                if outputLimit is None or outputLimit == -1 or not self.use_rawinput:
                     print(niceOutput)
                 else:
-                    limit = int(self.variables["output_limit"][0])
+                    limit = max(int(outputLimit), 1)
                     lines = niceOutput.split(newLine)
-                    while len(lines) > 0:
-                        outputStepLines = lines[:limit]
-                        lines = lines[limit:]
-                        for line in outputStepLines:
-                            print(line)
-                        if len(lines) == 0:
-                            break
-                        ch = input(
-                            "( Press <enter> to continue or <q><enter> to quit )"
-                        )
-                        if ch.lower() == "q":
-                            break
+                    for start in range(0, len(lines), limit):
+                        if start > 0:
+                            ch = input(
+                                "( Press <enter> to continue or <q><enter> to quit )"
+                            )
+                            if ch.lower() == "q":
+                                break
+                        # One write per page, with the same line endings print uses
+                        sys.stdout.write("\n".join(lines[start : start + limit]) + "\n")
 
     def modifyObject(
         self, obj, iteration: int = 0, contentFile: str = None, maxDepth: int = 10
@@ -5168,10 +5290,7 @@ class PDFConsole(cmd.Cmd):
                     content = fileContent.read()
             else:
                 if objectType in {"string", "hexstring"}:
-                    res = input(
-                        newLine
-                        + "Do you want to enter an ascii (1) or hexadecimal (2) string? (1/2) "
-                    )
+                    res = input(STRING_TYPE_PROMPT)
                     if res == "1":
                         newObjectType = "string"
                     elif res == "2":
@@ -5247,10 +5366,7 @@ class PDFConsole(cmd.Cmd):
                                 with open(contentFile, "rb") as fileContent:
                                     streamContent = fileContent.read()
                             else:
-                                streamContent = input(
-                                    f"{newLine}Please specify the stream content "
-                                    f"(if the content includes EOL characters use a file instead): {newLine * 2}"
-                                )
+                                streamContent = input(STREAM_CONTENT_PROMPT)
                             obj.setDecodedStream(streamContent)
                     else:
                         return (-1, "Nested streams are not permitted")
@@ -5295,18 +5411,16 @@ class PDFConsole(cmd.Cmd):
         @param stream: Boolean to specify if the object contains a stream or not.
         @return: The response chosen by the user
         """
-        message = ""
-        if not stream:
+        if stream:
+            message = MODIFY_STREAM_PROMPT
+        else:
             message = newLine
             if key is not None:
                 message += f"Key: {key}{newLine}"
             message += f"Raw value: {str(rawValue)}{newLine}"
             if rawValue != value:
                 message += f"Value: {str(value)}{newLine}"
-        message += f"{newLine}Do you want to modify, delete or make no action"
-        if stream:
-            message += " in the STREAM"
-        message += "? (m/d/n) "
+            message += MODIFY_PROMPT
         response = input(message)
         if response.lower() not in ["m", "d", "n"]:
             return None
@@ -5314,6 +5428,22 @@ class PDFConsole(cmd.Cmd):
             print(f"Value: {str(value)}{newLine}")
         return response.lower()
 
+    def parseIdVersion(self, thisId: str, version: str = None):
+        """
+        Method to validate and convert the object id and version arguments of a command
+
+        @param thisId: The object id argument
+        @param version: The version argument or None if it has not been specified
+        @return: A tuple (status,statusContent), where statusContent is a tuple (objectId,version) with integer values in case status = 0, or in case status = -1 an error message or None if the arguments are not valid
+        """
+        if not thisId.isdigit() or (version is not None and not version.isdigit()):
+            return (-1, None)
+        if version is not None:
+            version = int(version)
+            if version > self.pdfFile.getNumUpdates():
+                return (-1, "[!] Error: The version number is not valid")
+        return (0, (int(thisId), version))
+
     def parseArgs(self, args: str):
         """
         Method to split up the command arguments by quotes: \'\'\', " or \'
@@ -5321,109 +5451,35 @@ class PDFConsole(cmd.Cmd):
         @param args: The command arguments
         @return: An array with the separated arguments
         """
-        redirectSymbols = [">", ">>", "$>", "$>>"]
         self.redirect = None
         self.outputVarName = None
         self.outputFileName = None
         argsArray = []
-        while len(args) > 0:
-            if args[0] == "'":
-                if args[:3] == "'''":
-                    index = args[3:].find("'''")
-                    if index != -1:
-                        arg = args[3 : index + 3]
-                        argsArray.append(arg)
-                        if len(args) > index + 6:
-                            args = args[index + 6 :]
-                        else:
-                            args = ""
-                    else:
-                        return None
-                else:
-                    index = args[1:].find("'")
-                    if index != -1:
-                        arg = args[1 : index + 1]
-                        argsArray.append(arg)
-                        if len(args) > index + 2:
-                            args = args[index + 2 :]
-                        else:
-                            args = ""
-                    else:
-                        return None
-            elif args[0] == '"':
-                index = args[1:].find('"')
-                if index != -1:
-                    arg = args[1 : index + 1]
-                    argsArray.append(arg)
-                    if len(args) > index + 2:
-                        args = args[index + 2 :]
-                    else:
-                        args = ""
-                else:
-                    return None
-            elif args[0] == " ":
-                args = args[1:]
+        for match in reArgument.finditer(args):
+            if match.lastindex is None:
+                continue
+            if match.lastindex == 5:
+                # A quote which is not closed
+                return None
+            argsArray.append(match.group(match.lastindex))
+        if argsArray:
+            target = None
+            if len(argsArray) > 1 and argsArray[-2] in REDIRECT_SYMBOLS:
+                self.redirect = REDIRECT_SYMBOLS[argsArray[-2]]
+                target = argsArray[-1]
+                del argsArray[-2:]
             else:
-                index = args.find(" ")
-                if index != -1:
-                    arg = args[:index]
-                    argsArray.append(arg)
-                    if len(args) > index + 1:
-                        args = args[index + 1 :]
-                    else:
-                        args = ""
-                else:
-                    argsArray.append(args)
-                    args = ""
-        if len(argsArray) > 1:
-            if argsArray[-2] in redirectSymbols:
-                if argsArray[-2] == ">":
-                    self.redirect = FILE_WRITE
-                    self.outputFileName = argsArray[-1]
-                elif argsArray[-2] == ">>":
-                    self.redirect = FILE_ADD
-                    self.outputFileName = argsArray[-1]
-                elif argsArray[-2] == "$>":
-                    self.redirect = VAR_WRITE
-                    self.outputVarName = argsArray[-1]
-                elif argsArray[-2] == "$>>":
-                    self.redirect = VAR_ADD
-                    self.outputVarName = argsArray[-1]
-                argsArray.pop()
-                argsArray.pop()
-            elif argsArray[-1][:2] == ">>" and len(argsArray[-1]) > 2:
-                self.redirect = FILE_ADD
-                self.outputFileName = argsArray[-1][2:]
-                argsArray.pop()
-            elif argsArray[-1][:1] == ">" and len(argsArray[-1]) > 1:
-                self.redirect = FILE_WRITE
-                self.outputFileName = argsArray[-1][1:]
-                argsArray.pop()
-            elif argsArray[-1][:3] == "$>>" and len(argsArray[-1]) > 3:
-                self.redirect = VAR_ADD
-                self.outputVarName = argsArray[-1][3:]
-                argsArray.pop()
-            elif argsArray[-1][:2] == "$>" and len(argsArray[-1]) > 2:
-                self.redirect = VAR_WRITE
-                self.outputVarName = argsArray[-1][2:]
-                argsArray.pop()
-        elif len(argsArray) > 0:
-            if argsArray[-1][:2] == ">>" and len(argsArray[-1]) > 2:
-                self.redirect = FILE_ADD
-                self.outputFileName = argsArray[-1][2:]
-                argsArray.pop()
-            elif argsArray[-1][:1] == ">" and len(argsArray[-1]) > 1:
-                self.redirect = FILE_WRITE
-                self.outputFileName = argsArray[-1][1:]
-                argsArray.pop()
-            elif argsArray[-1][:3] == "$>>" and len(argsArray[-1]) > 3:
-                self.redirect = VAR_ADD
-                self.outputVarName = argsArray[-1][3:]
-                argsArray.pop()
-            elif argsArray[-1][:2] == "$>" and len(argsArray[-1]) > 2:
-                self.redirect = VAR_WRITE
-                self.outputVarName = argsArray[-1][2:]
-                argsArray.pop()
+                lastArg = argsArray[-1]
+                for symbol, redirect in REDIRECTIONS:
+                    if lastArg.startswith(symbol) and len(lastArg) > len(symbol):
+                        self.redirect = redirect
+                        target = lastArg[len(symbol) :]
+                        argsArray.pop()
+                        break
+            if self.redirect in (FILE_WRITE, FILE_ADD):
+                self.outputFileName = target
+            elif self.redirect in (VAR_WRITE, VAR_ADD):
+                self.outputVarName = target
 
         return argsArray
 
@@ -5431,35 +5487,18 @@ class PDFConsole(cmd.Cmd):
         """
         Given a byte string shows the hexadecimal and ascii output in a nice way
 
-        @param byteVal: A string
+        @param byteVal: A string or bytes
         @return: String with mixed hexadecimal and ascii strings, like the 'hexdump -C' output
         """
-        output = ""
+        byteVal = stringToBytes(byteVal)
         row = 16
-        if byteVal != "":
-            k = None
-            hexChain = ""
-            strings = ""
-            for k, v in enumerate(byteVal):
-                if ord(v) > 31 and ord(v) < 127:
-                    strings += v
-                else:
-                    strings += "."
-                hexChars = hex(ord(v))
-                hexChars = hexChars[2:]
-                if len(hexChars) == 1:
-                    hexChars = "0" + hexChars
-                hexChain += hexChars + " "
-                if k != 0 and k % row == row - 1:
-                    output += f"{hexChain}  |{strings}|{newLine}"
-                    hexChain = ""
-                    strings = ""
-            if k is not None and k % row != 0:
-                if hexChain == "":
-                    output = output[:-1]
-                else:
-                    output += f'{hexChain}{(48 - len(hexChain)) * " "}  |{strings + ((16 - len(strings)) * " ")}|'
-        return output
+        rows = []
+        for offset in range(0, len(byteVal), row):
+            chunk = byteVal[offset : offset + row]
+            hexChain = "".join(f"{value:02x} " for value in chunk)
+            strings = chunk.translate(printableTable).decode("latin-1")
+            rows.append(f"{hexChain:<48}  |{strings:<16}|")
+        return newLine.join(rows)
 
     def printResult(self, result: str):
         """
@@ -5478,7 +5517,7 @@ class PDFConsole(cmd.Cmd):
         self,
         node: int,
         nodesInfo: dict,
-        expandedNodes: list = None,
+        expandedNodes: set = None,
         depth: int = 0,
         recursive: bool = True,
     ):
@@ -5490,32 +5529,45 @@ class PDFConsole(cmd.Cmd):
         @param expandedNodes: Already expanded nodes
         @param depth: Actual depth of the tree
         @param recursive: Boolean to specify if it's a recursive call or not
-        @return: A tuple (expandedNodes,output), where expandedNodes is a list with the distinct nodes and output is the string representation of the tree
+        @return: A tuple (expandedNodes,output), where expandedNodes is a set with the distinct nodes and output is the string representation of the tree
         """
         if expandedNodes is None:
-            expandedNodes = []
-        output = ""
-        if node in nodesInfo:
-            tab = "\t"
-            if node not in expandedNodes or (node in expandedNodes and depth > 0):
-                output += f"{tab * depth}{nodesInfo[node][0]} ({str(node)}) {newLine}"
-            if node not in expandedNodes:
-                expandedNodes.append(node)
+            expandedNodes = set()
+        output = []
+        tab = "\t"
+        # Depth first traversal with an explicit stack. The entries are nodes to expand
+        # or lines already built, and the children are pushed in reverse order so they
+        # are popped in their original order.
+        stack = [(node, depth, None)]
+        while stack:
+            node, depth, line = stack.pop()
+            if line is not None:
+                output.append(line)
+                continue
+            if node not in nodesInfo:
+                continue
+            expanded = node in expandedNodes
+            if not expanded or depth > 0:
+                output.append(f"{tab * depth}{nodesInfo[node][0]} ({str(node)}) {newLine}")
+            if not expanded:
+                expandedNodes.add(node)
                 children = nodesInfo[node][1]
                 if children:
-                    for child in children:
+                    childDepth = depth + 1
+                    childIndent = tab * childDepth
+                    for child in reversed(children):
                         if child in nodesInfo:
                             childType = nodesInfo[child][0]
                         else:
                             childType = "Unknown"
                         if childType != "Unknown" and recursive:
-                            expChildrenNodes, childrenOutput = self.printTreeNode(
-                                child, nodesInfo, expandedNodes, depth + 1
-                            )
-                            output += childrenOutput
-                            expandedNodes = expChildrenNodes
+                            stack.append((child, childDepth, None))
                         else:
-                            output += f"{tab * (depth + 1)}{childType} ({str(child)}) {newLine}"
-                else:
-                    return expandedNodes, output
-        return expandedNodes, output
+                            stack.append(
+                                (
+                                    child,
+                                    childDepth,
+                                    f"{childIndent}{childType} ({str(child)}) {newLine}",
+                                )
+                            )
+        return expandedNodes, "".join(output)
@@ -128,6 +128,7 @@ isManualAnalysis = False
 spacesChars = ["\x00", "\x09", "\x0a", "\x0c", "\x0d", "\x20"]
 delimiterChars = ["<<", "(", "<", "[", "{", "/", "%"]
 refRegex = re.compile(r"\d+")
+referencedIdRegex = re.compile(r"(?<=\D)(\d+)\s{1,3}\d{1,3}\s{1,3}R")
 jsContexts = {"global": None}
 
 
@@ -174,18 +175,13 @@ class PDFObject:
         @param string: A string
         @return: A boolean to specify if the string has been found or not
         """
-        value = str(self.value)
-        rawValue = str(self.rawValue)
-        encValue = str(self.encryptedValue)
-        if (
-            re.findall(string, value, re.IGNORECASE) != []
-            or re.findall(string, rawValue, re.IGNORECASE) != []
-            or re.findall(string, encValue, re.IGNORECASE) != []
-        ):
-            return True
+        searchRegex = re.compile(string, re.IGNORECASE)
+        for content in (self.value, self.rawValue, self.encryptedValue):
+            if searchRegex.search(str(content)) is not None:
+                return True
         if self.containsJS():
             for js in self.JSCode:
-                if re.findall(string, js, re.IGNORECASE) != []:
+                if searchRegex.search(js) is not None:
                     return True
         return False
 
@@ -2246,24 +2242,20 @@ class PDFStream(PDFDictionary):
             self.decodedStream = stream
 
     def contains(self, string):
-        value = str(self.value)
-        rawValue = str(self.rawValue)
-        encValue = str(self.encryptedValue)
-        rawStream = str(self.rawStream)
-        encStream = str(self.encodedStream)
-        decStream = str(self.decodedStream)
-        if (
-            re.findall(string, value, re.IGNORECASE) != []
-            or re.findall(string, rawValue, re.IGNORECASE) != []
-            or re.findall(string, encValue, re.IGNORECASE) != []
-            or re.findall(string, rawStream, re.IGNORECASE) != []
-            or re.findall(string, encStream, re.IGNORECASE) != []
-            or re.findall(string, decStream, re.IGNORECASE) != []
+        searchRegex = re.compile(string, re.IGNORECASE)
+        for content in (
+            self.value,
+            self.rawValue,
+            self.encryptedValue,
+            self.rawStream,
+            self.encodedStream,
+            self.decodedStream,
         ):
-            return True
+            if searchRegex.search(str(content)) is not None:
+                return True
         if self.containsJS():
             for js in self.JSCode:
-                if re.findall(string, js, re.IGNORECASE) != []:
+                if searchRegex.search(js) is not None:
                     return True
         return False
 
@@ -6595,6 +6587,28 @@ class PDFFile:
             return indirectObject.getReferences()
         return None
 
+    def getReferencesIndex(self, version):
+        """
+        Get an index with the objects referencing each object in the specified version of the document, built with a single pass over the objects
+
+        @param version: The version of the document (int)
+        @return: A dictionary {objectId (string): [ids of the objects referencing it]} or None if the version is not valid
+        """
+        if version > self.updates or version < 0:
+            return None
+        referencesIndex = {}
+        indirectObjectsDict = self.body[version].getObjects()
+        for indirectObject in indirectObjectsDict.values():
+            if indirectObject is not None:
+                obj = indirectObject.getObject()
+                if obj is not None:
+                    referencedIds = set(referencedIdRegex.findall(obj.getValue()))
+                    for referencedId in referencedIds:
+                        referencesIndex.setdefault(referencedId, []).append(
+                            indirectObject.thisId
+                        )
+        return referencesIndex
+
     def getReferencesTo(self, thisId, version=None):
         """
         Get the references to the specified object in the document
@@ -7089,6 +7103,21 @@ class PDFFile:
             return (-1, errorMessage)
         return (0, "")
 
+    def release(self):
+        """
+        Drops the references to the parsed content of the document (bodies, cross reference tables, trailers, etc) so the memory can be reclaimed before parsing another file
+        """
+        self.body = []
+        self.crossRefTable = []
+        self.trailer = []
+        self.comments = []
+        self.errors = []
+        self.suspiciousElements = {}
+        self.encryptDict = None
+        self.JSCode = ""
+        self.garbageHeader = ""
+        self.binaryChars = ""
+
     def removeError(self, errorMessage="", errorType=None):
         """
         Removes the error message from the errors array. If an errorType is given, then all the error messages belonging to this type are removed.
@@ -7117,11 +7146,25 @@ class PDFFile:
         indirectObjects = {}
         xrefStreamObjectId = None
         xrefStreamObject = None
+        outputFile = None
+        tempPath = None
+        md5Hash = hashlib.md5()
         try:
             if version is None:
                 version = self.updates
-            outputFileContent = self.headerToFile(malformedOptions, headerFile)
-            offset = len(outputFileContent)
+            if not os.sep in filename:
+                outputPath = f"{pdfPath}{os.sep}{filename}"
+            else:
+                outputPath = filename
+            # Objects are written as they are serialized, not buffered in memory, to a
+            # temporary file which only replaces the output file if everything is saved
+            tempPath = f"{outputPath}.{os.getpid()}.tmp"
+            outputFile = open(tempPath, "wb", buffering=1 << 20)
+            header = self.headerToFile(malformedOptions, headerFile)
+            outputContent = header.encode()
+            outputFile.write(outputContent)
+            md5Hash.update(outputContent)
+            offset = len(header)
             for v in range(version + 1):
                 xrefStreamObjectId = None
                 xrefStreamObject = None
@@ -7182,8 +7225,10 @@ class PDFFile:
                                     objectFileOutput = objectFileOutput.replace(
                                         f"{newLine}endobj", ""
                                     )
-                                outputFileContent += objectFileOutput
-                                offset = len(outputFileContent)
+                                outputContent = objectFileOutput.encode()
+                                outputFile.write(outputContent)
+                                md5Hash.update(outputContent)
+                                offset += len(objectFileOutput)
                                 indirectObject.setSize(
                                     offset - indirectObject.getOffset()
                                 )
@@ -7216,10 +7261,12 @@ class PDFFile:
                         objectFileOutput = objectFileOutput.replace(
                             f"{newLine}endstream", ""
                         )
-                    outputFileContent += objectFileOutput
+                    outputContent = objectFileOutput.encode()
+                    outputFile.write(outputContent)
+                    md5Hash.update(outputContent)
                     prevXrefStreamOffset = offset
                     lastXrefSectionOffset = offset
-                    offset = len(outputFileContent)
+                    offset += len(objectFileOutput)
                     xrefStreamObject.setSize(offset - xrefStreamObject.getOffset())
                     indirectObjects[xrefStreamObjectId] = xrefStreamObject
                 self.body[v].setNextOffset(offset)
@@ -7231,8 +7278,11 @@ class PDFFile:
                 ):
                     section.setOffset(offset)
                     lastXrefSectionOffset = offset
-                    outputFileContent += section.toFile()
-                    offset = len(outputFileContent)
+                    sectionOutput = section.toFile()
+                    outputContent = sectionOutput.encode()
+                    outputFile.write(outputContent)
+                    md5Hash.update(outputContent)
+                    offset += len(sectionOutput)
                     section.setSize(offset - section.getOffset())
                     self.crossRefTable[v][0] = section
 
@@ -7243,27 +7293,36 @@ class PDFFile:
                         trailer.setNumObjects(maxId + 1)
                         if prevXrefSectionOffset != 0:
                             trailer.setPrevCrossRefSection(prevXrefSectionOffset)
-                    outputFileContent += trailer.toFile()
-                    offset = len(outputFileContent)
+                    trailerOutput = trailer.toFile()
+                    outputContent = trailerOutput.encode()
+                    outputFile.write(outputContent)
+                    md5Hash.update(outputContent)
+                    offset += len(trailerOutput)
                     trailer.setSize(offset - trailer.getOffset())
                     self.trailer[v][0] = trailer
                 prevXrefSectionOffset = lastXrefSectionOffset
                 self.body[v].setObjects(indirectObjects)
-                offset = len(outputFileContent)
-            if not os.sep in filename:
-                outputPath = f"{pdfPath}{os.sep}{filename}"
-            else:
-                outputPath = filename
-            if isinstance(outputFileContent, str):
-                outputFileContent = outputFileContent.encode()
-            with open(outputPath, "wb") as writeOutput:
-                writeOutput.write(outputFileContent)
-            self.setMD5(hashlib.md5(outputFileContent).hexdigest())
-            self.setSize(len(outputFileContent))
+            self.setMD5(md5Hash.hexdigest())
+            self.setSize(outputFile.tell())
+            outputFile.close()
+            try:
+                os.chmod(tempPath, os.stat(outputPath).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(tempPath, outputPath)
+            tempPath = None
             self.path = os.path.realpath(filename)
             self.fileName = filename
         except:
             return (-1, "Unspecified error")
+        finally:
+            if outputFile is not None:
+                outputFile.close()
+            if tempPath is not None:
+                try:
+                    os.remove(tempPath)
+                except OSError:
+                    pass
         return (0, "")
 
     def setDetectionRate(self, newRate):
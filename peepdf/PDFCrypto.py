@@ -384,6 +384,16 @@ def xor(byteVal, key):
     @param key: Key used for the operation, it's cycled.
     @return: The xored bytes
     """
+    if len(key) == 1 and ord(key) < 256:
+        # A one byte key is a fixed byte substitution, done in a single translate call
+        keyValue = ord(key)
+        table = bytes(value ^ keyValue for value in range(256))
+        if isinstance(byteVal, (bytes, bytearray)):
+            return byteVal.translate(table)
+        try:
+            return byteVal.encode("latin-1").translate(table).decode("latin-1")
+        except UnicodeEncodeError:
+            pass
     key = cycle(key)
     return "".join(chr(ord(x) ^ ord(y)) for (x, y) in zip(byteVal, key))
 
@@ -37,11 +37,25 @@ try:
 except ImportError:
     ENABLED_XML = False
 
+try:
+    import orjson
+
+    ORJSON_MODULE = True
+except ModuleNotFoundError:
+    ORJSON_MODULE = False
+
 try:
     from peepdf.PDFVulns import vulnsDict, vulnsVersion
 except ModuleNotFoundError:
     from PDFVulns import vulnsDict, vulnsVersion
 
+regExpEscapeTable = str.maketrans({char: f"\\{char}" for char in "\\()[]{}.|^$*+?"})
+nonPrintableBytes = bytes(range(32)) + bytes(range(127, 256))
+# Same bytes as nonPrintableBytes mapped to dots, for the ascii column of hexdumps
+printableTable = bytes(range(256)).translate(
+    bytes.maketrans(nonPrintableBytes, b"." * len(nonPrintableBytes))
+)
+
 
 def clearScreen():
     """
@@ -78,14 +92,14 @@ def countNonPrintableChars(string: str):
     """
     Simple method to return the non printable characters found in an string
 
-    @param string: A string
+    @param string: A string or bytes
     @return: Number of non printable characters in the string
     """
-    counter = 0
-    for _, thisString in enumerate(string):
-        if ord(thisString) <= 31 or ord(thisString) >= 127:
-            counter += 1
-    return counter
+    size = len(string)
+    if isinstance(string, str):
+        # Characters out of the ascii range are never printable, so they are dropped
+        string = string.encode("ascii", "ignore")
+    return size - len(string.translate(None, nonPrintableBytes))
 
 
 def decodeName(name: str):
@@ -168,14 +182,7 @@ def escapeRegExpString(string: str):
     @param string: A regular expression to be escaped
     @return: Escaped string
     """
-    toEscapeChars = ["\\", "(", ")", ".", "|", "^", "$", "*", "+", "?", "[", "]"]
-    escapedValue = ""
-    for _, thisString in enumerate(string):
-        if thisString in toEscapeChars:
-            escapedValue += f"\\{thisString}"
-        else:
-            escapedValue += thisString
-    return escapedValue
+    return string.translate(regExpEscapeTable)
 
 
 def escapeString(string: str):
@@ -304,17 +311,14 @@ def getBytesFromFile(filename: str, offset: int, numBytes: int):
     """
     if not isinstance(offset, int) or not isinstance(numBytes, int):
         return (-1, "The offset and the number of bytes must be integers")
-    if os.path.exists(filename):
-        fileSize = os.path.getsize(filename)
-        bytesFile = open(filename, "rb")
-        bytesFile.seek(offset)
-        if offset + numBytes > fileSize:
-            byteVal = bytesFile.read()
-        else:
+    try:
+        with open(filename, "rb") as bytesFile:
+            bytesFile.seek(offset)
+            # Reading past the end of the file just returns the remaining bytes
             byteVal = bytesFile.read(numBytes)
-        bytesFile.close()
-        return (0, byteVal)
-    return (-1, "File does not exist")
+    except FileNotFoundError:
+        return (-1, "File does not exist")
+    return (0, byteVal)
 
 
 def hexToString(hexString: str):
@@ -376,6 +380,25 @@ def numToString(num: int, numDigits: int):
     return (0, strNum)
 
 
+def stringToBytes(string: str):
+    """
+    Given a string returns its bytes, keeping the byte value of each character when possible
+
+    The string is encoded as latin-1, so characters up to U+00FF become a single byte with
+    the same value. If any character is out of that range the whole string is encoded as
+    UTF-8 instead, without any warning, so its latin-1 characters become two bytes.
+
+    @param string: A string or bytes
+    @return: The bytes of the string, or the input itself if it was not a string
+    """
+    if not isinstance(string, str):
+        return string
+    try:
+        return string.encode("latin-1")
+    except UnicodeEncodeError:
+        return string.encode()
+
+
 def unescapeHTMLEntities(text: str):
     """
     Removes HTML or XML character references and entities from a text string.
@@ -449,19 +472,25 @@ def unescapeString(string: str):
     return unescapedValue
 
 
-def vtcheck(md5: str, vtKey: str):
+def vtcheck(md5: str, vtKey: str, session: requests.Session = None):
     """
     Function to check a hash on VirusTotal and get the report summary
 
     @param md5: The MD5 to check (hexdigest)
     @param vtKey: The VirusTotal API key needed to perform the request
+    @param session: A requests session to reuse its connection. Default value: None.
     @return: A dictionary with the result of the request
     """
     vtUrl = f"https://www.virustotal.com/api/v3/files/{md5}"
     headers = {"accept": "application/json", "x-apikey": vtKey}
+    if session is None:
+        session = requests
     try:
-        response = requests.get(vtUrl, headers=headers, timeout=10)
-        jsonResponse = response.json()
+        response = session.get(vtUrl, headers=headers, timeout=10)
+        if ORJSON_MODULE:
+            jsonResponse = orjson.loads(response.content)
+        else:
+            jsonResponse = response.json()
     except:
         return (-1, "The request to VirusTotal failed")
     if "error" in jsonResponse: